@@ -17,15 +17,28 @@ Features (v0.1):
 import argparse
 import json
 import os
+import pwd
 import socket
+import threading
 import time
 from datetime import datetime, timezone
+from pathlib import Path
+from queue import SimpleQueue
 
 try:
     import psutil  # type: ignore
 except ImportError:
-    print("[!] psutil is required. Install with: pip install psutil")
-    raise
+    psutil = None  # Only needed on hosts without a readable /proc
+
+try:
+    import ahocorasick  # type: ignore
+except ImportError:
+    ahocorasick = None  # Optional: falls back to a generated match function
+
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None  # Optional: falls back to the stdlib json module
 
 # ---------------------------------------------------------------------------
 # Signature configuration (MVP – can later move to external JSON/YAML)
@@ -82,100 +95,370 @@ SIGNATURES = [
     },
 ]
 
+AGENT_VERSION = "v0.1"
+PRODUCT_NAME = "Red Specter AI Usage Watchdog"
+
+MATCH_TYPES = ("process_name_contains", "cmdline_contains")
+
+PROC_ROOT = "/proc"
+
+# /proc/<pid>/comm is truncated to TASK_COMM_LEN - 1 bytes
+COMM_MAX_LEN = 15
+
+LOG_BUFFER_SIZE = 64 * 1024
+
+# uid -> username cache for username_for_uid()
+USERNAMES = {}
+
 # ---------------------------------------------------------------------------
 # Core logic
 # ---------------------------------------------------------------------------
 
 
 def ensure_log_dir(path: str) -> None:
-    directory = os.path.dirname(os.path.abspath(path))
-    if directory and not os.path.exists(directory):
-        os.makedirs(directory, exist_ok=True)
+    Path(path).absolute().parent.mkdir(parents=True, exist_ok=True)
 
 
 def utc_now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
-def match_signature(sig: dict, proc_info: dict) -> bool:
-    """Return True if this process matches the given signature."""
-    pname = (proc_info.get("name") or "").lower()
-    cmdline_list = proc_info.get("cmdline") or []
-    cmdline_str = " ".join(cmdline_list).lower()
+def build_matcher(signatures) -> dict:
+    """Pre-process signatures into a matcher for match_process()."""
+    matcher = {"signatures": list(signatures)}
+    matcher["fragments"] = [
+        signature_fragment(sig) for sig in matcher["signatures"]
+    ]
+
+    if ahocorasick is None:
+        matcher["match"] = compile_match_function(matcher["signatures"])
+        return matcher
+
+    for mtype in MATCH_TYPES:
+        patterns = {}
+        for idx, sig in enumerate(matcher["signatures"]):
+            pattern = sig.get("pattern", "").lower().encode("utf-8")
+            if pattern and sig.get("match_type", "") == mtype:
+                patterns.setdefault(pattern, []).append(idx)
+
+        if not patterns:
+            matcher[mtype] = None
+            continue
+
+        # pyahocorasick is normally built for str keys; latin-1 maps
+        # each byte to one code point, so substring results are the
+        # same as matching the bytes themselves. Keys are folded the same
+        # way match_process() folds the text.
+        automaton = ahocorasick.Automaton()
+        for pattern, indices in patterns.items():
+            key = pattern.decode("latin-1").lower()
+            automaton.add_word(key, tuple(indices))
+        automaton.make_automaton()
+        matcher[mtype] = automaton
+
+    return matcher
+
+
+def compile_match_function(signatures):
+    """Generate a straight-line `_match(pname, cmd, out)` for these signatures."""
+    fields = {"process_name_contains": "pname", "cmdline_contains": "cmd"}
+    lines = ["def _match(pname, cmd, out):"]
+
+    for idx, sig in enumerate(signatures):
+        pattern = sig.get("pattern", "").lower().encode("utf-8")
+        field = fields.get(sig.get("match_type", ""))
+        if pattern and field:
+            lines.append(f"    if {pattern!r} in {field}: out.append({idx})")
+
+    if len(lines) == 1:
+        lines.append("    pass")
+
+    namespace = {}
+    exec(compile("\n".join(lines) + "\n", "<signatures>", "exec"), namespace)
+    return namespace["_match"]
+
+
+def json_bytes(obj) -> bytes:
+    """Serialize a value to compact UTF-8 JSON, via orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode(
+        "utf-8"
+    )
+
+
+def signature_fragment(sig: dict) -> bytes:
+    """Serialize the constant signature tail of an event, closing brace included."""
+    tail = {
+        "signature_name": sig.get("name"),
+        "signature_description": sig.get("description"),
+        "risk": sig.get("risk", "unknown"),
+        "category": sig.get("category", "unknown"),
+        "version": AGENT_VERSION,
+        "product": PRODUCT_NAME,
+    }
+    tail_json = json.dumps(tail, ensure_ascii=False, separators=(",", ":"))
+    return tail_json[1:].encode("utf-8") + b"\n"
+
+
+def _find(table, text: str, hits: set) -> None:
+    """Add the index of every signature in `table` that matches `text`."""
+    if table is None:
+        return
+    for _, indices in table.iter(text):
+        hits.update(indices)
+
+
+def match_process(matcher: dict, pname_raw: bytes, cmdline_raw: bytes) -> list:
+    """Return the sorted indices of all signatures matching this process."""
+    match_fn = matcher.get("match")
+    if match_fn is not None:
+        hits = []
+        match_fn(pname_raw.lower(), cmdline_raw.replace(b"\0", b" ").lower(), hits)
+        return hits
 
-    pattern = sig.get("pattern", "").lower()
-    mtype = sig.get("match_type", "")
+    # The automaton takes str: decode once, then fold the decoded text
+    pname_lc = pname_raw.decode("latin-1").lower()
+    cmdline_lc = cmdline_raw.decode("latin-1").replace("\0", " ").lower()
 
-    if not pattern or not mtype:
-        return False
+    hits = set()
+    _find(matcher["process_name_contains"], pname_lc, hits)
+    _find(matcher["cmdline_contains"], cmdline_lc, hits)
+    return sorted(hits)
 
-    if mtype == "process_name_contains":
-        return pattern in pname
-    elif mtype == "cmdline_contains":
-        return pattern in cmdline_str
 
-    return False
+def username_for_uid(uid: int) -> str:
+    """Resolve a uid to a username, caching only successful lookups."""
+    name = USERNAMES.get(uid)
+    if name is None:
+        try:
+            name = USERNAMES[uid] = pwd.getpwuid(uid).pw_name
+        except KeyError:
+            return str(uid)
+    return name
 
 
-def scan_once(signatures, seen, hostname, logfile, debug=False):
-    """Perform a single scan of running processes."""
+def iter_processes():
+    """Yield (pid, comm, NUL-separated cmdline, username) per running process."""
+    try:
+        entries = os.listdir(PROC_ROOT)
+    except OSError:
+        yield from _iter_processes_psutil()
+        return
+
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+
+        base = f"{PROC_ROOT}/{entry}"
+        try:
+            with open(f"{base}/comm", "rb") as f:
+                name = f.read().rstrip(b"\n")
+            with open(f"{base}/cmdline", "rb") as f:
+                cmdline = f.read()
+            uid = os.stat(base).st_uid
+        except OSError:
+            continue
+
+        if cmdline.endswith(b"\0"):
+            cmdline = cmdline[:-1]
+            rewritten = b"\0" not in cmdline
+        else:
+            if cmdline.endswith(b" "):
+                cmdline = cmdline[:-1]
+            rewritten = True
+
+        # Processes that overwrite their argv (setproctitle-style) leave one
+        # space-separated string; split it on spaces, as psutil does.
+        if rewritten:
+            cmdline = cmdline.replace(b" ", b"\0")
+
+        # Recover the full executable name when comm was truncated,
+        # the same way psutil does.
+        if len(name) >= COMM_MAX_LEN and cmdline:
+            exe = os.path.basename(cmdline.split(b"\0", 1)[0])
+            if exe.startswith(name):
+                name = exe
+
+        yield int(entry), name, cmdline, username_for_uid(uid)
+
+
+def _iter_processes_psutil():
+    # process_iter() with attrs already batches reads via Process.oneshot().
+    # psutil >= 6.0 also drops the per-process PID-reuse check (~20x faster
+    # iteration), so prefer a recent release on hosts that need this path.
+    if psutil is None:
+        raise OSError(
+            f"{PROC_ROOT} is not readable and psutil is not installed "
+            "(pip install psutil)"
+        )
+
+    for proc in psutil.process_iter(["pid", "name", "cmdline", "username"]):
+        try:
+            info = proc.info
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            continue
+
+        yield (
+            info.get("pid"),
+            os.fsencode(info.get("name") or ""),
+            os.fsencode("\0".join(info.get("cmdline") or [])),
+            info.get("username") or "unknown",
+        )
+
+
+def scan_once(matcher, seen, hostname_json, out_queue, debug=False):
+    """
+    Perform a single scan of running processes.
+
+    A PID whose /proc read fails for one cycle is logged again afterwards.
+    """
+    chunks = []
     events_written = 0
+    seen_now = {}
+    # All events found in one scan share the cycle's timestamp
+    timestamp = utc_now_iso()
+    cycle_head = (
+        b'{"timestamp_utc":' + json_bytes(timestamp) + b","
+        b'"hostname":' + hostname_json + b","
+    )
 
     try:
-        with open(logfile, "a", encoding="utf-8") as f:
-            for proc in psutil.process_iter(["pid", "name", "cmdline", "username"]):
-                try:
-                    info = proc.info
-                except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+        for pid, pname_raw, cmdline_raw, username in iter_processes():
+            matches = match_process(matcher, pname_raw, cmdline_raw)
+            if not matches:
+                continue
+
+            process_head = None
+            logged = seen.get(pid, 0)
+
+            for idx in matches:
+                bit = 1 << idx
+                if logged & bit:
+                    # Already logged this pid+signature combo this run
                     continue
 
-                pid = info.get("pid")
-                pname = info.get("name") or ""
-                cmdline = info.get("cmdline") or []
-                username = info.get("username") or "unknown"
-
-                for sig in signatures:
-                    if not match_signature(sig, info):
-                        continue
-
-                    key = (pid, sig["name"])
-                    if key in seen:
-                        # Already logged this pid+signature combo this run
-                        continue
-
-                    seen.add(key)
-
-                    event = {
-                        "timestamp_utc": utc_now_iso(),
-                        "hostname": hostname,
-                        "username": username,
-                        "pid": pid,
-                        "process_name": pname,
-                        "cmdline": cmdline,  # Command line only; NOT logging file content or prompts
-                        "signature_name": sig.get("name"),
-                        "signature_description": sig.get("description"),
-                        "risk": sig.get("risk", "unknown"),
-                        "category": sig.get("category", "unknown"),
-                        "version": "v0.1",
-                        "product": "Red Specter AI Usage Watchdog",
-                    }
-
-                    f.write(json.dumps(event, ensure_ascii=False) + "\n")
-                    events_written += 1
-
-                    if debug:
-                        print(
-                            f"[MATCH] {event['timestamp_utc']} "
-                            f"{event['process_name']} (pid={pid}) "
-                            f"-> {event['signature_name']} "
-                            f"[risk={event['risk']}]"
-                        )
+                logged |= bit
+                sig = matcher["signatures"][idx]
+
+                if process_head is None:
+                    # Decode and serialize only for processes being logged.
+                    # Command line only; NOT logging file content or prompts
+                    pname = pname_raw.decode("utf-8", "replace")
+                    cmdline = (
+                        cmdline_raw.decode("utf-8", "replace").split("\0")
+                        if cmdline_raw
+                        else []
+                    )
+                    process_head = (
+                        b'"username":' + json_bytes(username) + b","
+                        b'"pid":' + json_bytes(pid) + b","
+                        b'"process_name":' + json_bytes(pname) + b","
+                        b'"cmdline":' + json_bytes(cmdline) + b","
+                    )
+
+                chunks.append(cycle_head)
+                chunks.append(process_head)
+                chunks.append(matcher["fragments"][idx])
+                events_written += 1
+
+                if debug:
+                    print(
+                        f"[MATCH] {timestamp} "
+                        f"{pname} (pid={pid}) "
+                        f"-> {sig.get('name')} "
+                        f"[risk={sig.get('risk', 'unknown')}]"
+                    )
+
+            seen_now[pid] = logged
     except OSError as e:
-        print(f"[!] Failed to write log file '{logfile}': {e}")
+        # Keep the previous state; a partial scan would forget live PIDs
+        print(f"[!] Process scan failed: {e}")
+        for pid, logged in seen_now.items():
+            seen[pid] = seen.get(pid, 0) | logged
+    else:
+        seen.clear()
+        seen.update(seen_now)
+
+    if events_written:
+        out_queue.put(b"".join(chunks))
 
     return events_written
 
 
+def open_log(path: str):
+    """Open the JSONL log for buffered binary appends, or None on failure."""
+    try:
+        return open(path, "ab", buffering=LOG_BUFFER_SIZE)
+    except OSError as e:
+        print(f"[!] Failed to open log file '{path}': {e}")
+        return None
+
+
+def log_rotated(path: str, log) -> bool:
+    """True if `path` no longer names the file `log` has open."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return True
+    fst = os.fstat(log.fileno())
+    return (st.st_dev, st.st_ino) != (fst.st_dev, fst.st_ino)
+
+
+def log_writer(path: str, in_queue) -> None:
+    """Append queued chunks to the log at `path` until a None sentinel arrives."""
+    log = open_log(path)
+    # Chunks that could not be written because the log would not open
+    pending = []
+
+    while True:
+        chunk = in_queue.get()
+        if chunk is None:
+            break
+
+        pending.append(chunk)
+        try:
+            if log is not None and log_rotated(path, log):
+                close_log(log)
+                log = None
+            if log is None:
+                log = open_log(path)
+                if log is None:
+                    continue
+
+            data, pending = b"".join(pending), []
+            log.write(data)
+            if in_queue.empty():
+                log.flush()
+        except OSError as e:
+            print(f"[!] Failed to write log file '{path}': {e}")
+
+    if pending:
+        # log is None here; one last attempt before shutting down
+        log = open_log(path)
+        if log is None:
+            print(f"[!] {len(pending)} event batch(es) could not be logged")
+        else:
+            try:
+                log.write(b"".join(pending))
+            except OSError as e:
+                print(f"[!] Failed to write log file '{path}': {e}")
+
+    if log is not None:
+        close_log(log)
+
+
+def close_log(log) -> None:
+    """Flush buffered events, sync them to disk and close the log."""
+    try:
+        log.flush()
+        os.fsync(log.fileno())
+    except OSError as e:
+        print(f"[!] Failed to sync log file '{log.name}': {e}")
+    finally:
+        log.close()
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Red Specter AI Usage Watchdog (Linux Agent v0.1)"
@@ -218,21 +501,37 @@ def main():
         f"    Mode     : {'single-scan' if args.once else 'continuous'}"
     )
 
-    seen = set()
+    seen = {}
+    matcher = build_matcher(SIGNATURES)
+    hostname_json = json_bytes(hostname)
 
-    if args.once:
-        events = scan_once(SIGNATURES, seen, hostname, args.logfile, args.debug)
-        print(f"[+] Scan complete. Events logged: {events}")
-        return
+    out_queue = SimpleQueue()
+    writer = threading.Thread(
+        target=log_writer,
+        args=(args.logfile, out_queue),
+        name="log-writer",
+        daemon=True,
+    )
+    writer.start()
 
     try:
-        while True:
-            events = scan_once(SIGNATURES, seen, hostname, args.logfile, args.debug)
-            if args.debug:
-                print(f"[+] Cycle complete. Events logged this cycle: {events}")
-            time.sleep(args.interval)
-    except KeyboardInterrupt:
-        print("\n[+] Watchdog stopped by user (Ctrl+C). Goodbye.")
+        if args.once:
+            events = scan_once(matcher, seen, hostname_json, out_queue, args.debug)
+            print(f"[+] Scan complete. Events logged: {events}")
+            return
+
+        try:
+            while True:
+                events = scan_once(matcher, seen, hostname_json, out_queue, args.debug)
+                if args.debug:
+                    print(f"[+] Cycle complete. Events logged this cycle: {events}")
+                time.sleep(args.interval)
+        except KeyboardInterrupt:
+            print("\n[+] Watchdog stopped by user (Ctrl+C). Goodbye.")
+    finally:
+        # Drain pending events; the writer syncs and closes the log
+        out_queue.put(None)
+        writer.join()
 
 
 if __name__ == "__main__":
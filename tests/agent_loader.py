@@ -0,0 +1,16 @@
+import importlib.util
+from pathlib import Path
+
+AGENT_PATH = (
+    Path(__file__).resolve().parent.parent / "agent" / "redspecter_ai_usage_watchdog.py"
+)
+
+
+def load_agent():
+    """Import a fresh copy of the agent script so tests can patch its globals."""
+    spec = importlib.util.spec_from_file_location(
+        "redspecter_ai_usage_watchdog", AGENT_PATH
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,99 @@
+import contextlib
+import io
+import os
+import tempfile
+import threading
+import unittest
+from queue import SimpleQueue
+
+from agent_loader import load_agent
+
+
+class TestLogWriter(unittest.TestCase):
+    def setUp(self):
+        self.agent = load_agent()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "events.jsonl")
+        self.queue = SimpleQueue()
+        self.writer = threading.Thread(
+            target=self.agent.log_writer, args=(self.path, self.queue)
+        )
+        self.writer.start()
+
+    def put_and_wait(self, chunk, path):
+        """Queue a chunk and wait until it has been flushed to `path`."""
+        self.queue.put(chunk)
+        for _ in range(500):
+            try:
+                with open(path, "rb") as f:
+                    if f.read().endswith(chunk):
+                        return
+            except FileNotFoundError:
+                pass
+            threading.Event().wait(0.01)
+        self.fail(f"{chunk!r} never reached {path}")
+
+    def stop(self):
+        self.queue.put(None)
+        self.writer.join()
+
+    def read(self, path):
+        with open(path, "rb") as f:
+            return f.read()
+
+    def test_reopens_after_rename_rotation(self):
+        self.put_and_wait(b"one\n", self.path)
+        os.rename(self.path, self.path + ".1")
+        self.put_and_wait(b"two\n", self.path)
+        self.stop()
+        self.assertEqual(self.read(self.path + ".1"), b"one\n")
+        self.assertEqual(self.read(self.path), b"two\n")
+
+    def test_reopens_after_delete(self):
+        self.put_and_wait(b"one\n", self.path)
+        os.unlink(self.path)
+        self.put_and_wait(b"two\n", self.path)
+        self.stop()
+        self.assertEqual(self.read(self.path), b"two\n")
+
+    def wait_for_output(self, out, text, count):
+        for _ in range(500):
+            if out.getvalue().count(text) >= count:
+                return
+            threading.Event().wait(0.01)
+        self.fail(f"{text!r} printed fewer than {count} times")
+
+    def test_chunk_queued_while_open_fails_is_kept(self):
+        self.stop()
+        missing = os.path.join(self.tmp.name, "later", "events.jsonl")
+        self.writer = threading.Thread(
+            target=self.agent.log_writer, args=(missing, self.queue)
+        )
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            self.writer.start()
+            self.queue.put(b"first\n")
+            # Initial open at startup, then the retry for "first"
+            self.wait_for_output(out, "Failed to open log file", 2)
+            os.mkdir(os.path.dirname(missing))
+            self.put_and_wait(b"second\n", missing)
+            self.stop()
+        self.assertEqual(self.read(missing), b"first\nsecond\n")
+
+    def test_pending_chunk_written_on_shutdown(self):
+        self.stop()
+        missing = os.path.join(self.tmp.name, "later", "events.jsonl")
+        self.writer = threading.Thread(
+            target=self.agent.log_writer, args=(missing, self.queue)
+        )
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            self.writer.start()
+            self.queue.put(b"first\n")
+            self.wait_for_output(out, "Failed to open log file", 2)
+            os.mkdir(os.path.dirname(missing))
+            self.stop()
+        self.assertEqual(self.read(missing), b"first\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
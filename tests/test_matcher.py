@@ -0,0 +1,138 @@
+import types
+import unittest
+
+try:
+    import ahocorasick  # type: ignore
+except ImportError:
+    ahocorasick = None
+
+from agent_loader import load_agent
+
+
+class StubAutomaton:
+    """Minimal stand-in for ahocorasick.Automaton: reports every occurrence."""
+
+    def __init__(self):
+        self.words = {}
+
+    def add_word(self, key, value):
+        self.words[key] = value
+
+    def make_automaton(self):
+        pass
+
+    def iter(self, text):
+        for key, value in self.words.items():
+            start = text.find(key)
+            while start != -1:
+                yield start + len(key) - 1, value
+                start = text.find(key, start + 1)
+
+
+def sig(name, match_type, pattern):
+    return {"name": name, "match_type": match_type, "pattern": pattern}
+
+
+QUOTED = 'say "hi" \'there\' \\n\\x00'
+
+EXTRA_SIGNATURES = [
+    sig("spans_args", "cmdline_contains", "serve --model"),
+    sig("quoted", "cmdline_contains", QUOTED),
+    sig("empty_pattern", "cmdline_contains", ""),
+    sig("unknown_type", "environ_contains", "curl"),
+    sig("upper_pattern", "process_name_contains", "LocalAI"),
+]
+
+
+class TestMatcher(unittest.TestCase):
+    automaton_module = types.SimpleNamespace(Automaton=StubAutomaton)
+
+    def setUp(self):
+        self.generated = load_agent()
+        self.generated.ahocorasick = None
+
+        self.automaton = load_agent()
+        self.automaton.ahocorasick = self.automaton_module
+
+    def assert_matches(self, signatures, pname, argv, expected):
+        """Both matcher backends must return the same signature indices."""
+        cmdline = b"\0".join(arg.encode("utf-8") for arg in argv)
+        for agent in (self.generated, self.automaton):
+            matcher = agent.build_matcher(signatures)
+            with self.subTest(backend="ahocorasick" if agent.ahocorasick else "exec"):
+                hits = agent.match_process(matcher, pname.encode("utf-8"), cmdline)
+                self.assertEqual(hits, expected)
+
+    def test_backends_differ(self):
+        gen = self.generated.build_matcher(self.generated.SIGNATURES)
+        auto = self.automaton.build_matcher(self.automaton.SIGNATURES)
+        self.assertIn("match", gen)
+        self.assertNotIn("match", auto)
+        self.assertIsInstance(
+            auto["cmdline_contains"], self.automaton_module.Automaton
+        )
+
+    def test_process_name_match(self):
+        self.assert_matches(self.generated.SIGNATURES, "ollama", ["ollama"], [0])
+
+    def test_cmdline_match(self):
+        self.assert_matches(
+            self.generated.SIGNATURES,
+            "curl",
+            ["curl", "https://api.anthropic.com/v1/messages"],
+            [3],
+        )
+
+    def test_multiple_matches_in_signature_order(self):
+        self.assert_matches(
+            self.generated.SIGNATURES,
+            "ollama",
+            ["python", "llm.py", "--api", "generativelanguage.googleapis.com"],
+            [0, 4, 5],
+        )
+
+    def test_no_match(self):
+        self.assert_matches(self.generated.SIGNATURES, "bash", ["bash", "-l"], [])
+
+    def test_upper_case_input(self):
+        self.assert_matches(
+            self.generated.SIGNATURES,
+            "OLLAMA",
+            ["CURL", "HTTPS://API.OPENAI.COM"],
+            [0, 2],
+        )
+
+    def test_pattern_spanning_two_arguments(self):
+        signatures = self.generated.SIGNATURES + EXTRA_SIGNATURES
+        self.assert_matches(signatures, "x", ["app", "serve", "--model", "m"], [6])
+        self.assert_matches(signatures, "x", ["app", "serve--model"], [])
+
+    def test_pattern_with_quotes_and_backslashes(self):
+        signatures = self.generated.SIGNATURES + EXTRA_SIGNATURES
+        self.assert_matches(signatures, "x", ["echo", QUOTED.upper()], [7])
+        # The escape sequences must stay literal, not be interpreted
+        self.assert_matches(signatures, "x", ["echo", "say \"hi\" 'there' \n"], [])
+
+    def test_empty_pattern_and_unknown_match_type_skipped(self):
+        signatures = self.generated.SIGNATURES + EXTRA_SIGNATURES
+        self.assert_matches(signatures, "curl", ["curl", "example.org"], [])
+
+    def test_upper_case_pattern(self):
+        signatures = self.generated.SIGNATURES + EXTRA_SIGNATURES
+        self.assert_matches(signatures, "local-ai", ["x"], [])
+        self.assert_matches(signatures, "localai-server", ["x"], [10])
+
+    def test_empty_signature_list(self):
+        self.assert_matches([], "ollama", ["api.openai.com", "llm"], [])
+
+
+
+@unittest.skipIf(ahocorasick is None, "pyahocorasick not installed")
+class TestRealAutomaton(TestMatcher):
+    """Same cases against the real pyahocorasick Automaton."""
+
+    automaton_module = ahocorasick
+
+
+if __name__ == "__main__":
+    unittest.main()
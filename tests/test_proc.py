@@ -0,0 +1,111 @@
+import os
+import tempfile
+import types
+import unittest
+
+from agent_loader import load_agent
+
+
+class TestIterProcesses(unittest.TestCase):
+    def setUp(self):
+        self.agent = load_agent()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.agent.PROC_ROOT = self.tmp.name
+        os.mkdir(os.path.join(self.tmp.name, "self"))  # non-PID entry
+
+    def add_proc(self, pid, comm=None, cmdline=None):
+        base = os.path.join(self.tmp.name, str(pid))
+        os.mkdir(base)
+        if comm is not None:
+            with open(os.path.join(base, "comm"), "wb") as f:
+                f.write(comm + b"\n")
+        if cmdline is not None:
+            with open(os.path.join(base, "cmdline"), "wb") as f:
+                f.write(cmdline)
+
+    def procs(self):
+        return {pid: (name, cmd) for pid, name, cmd, _ in self.agent.iter_processes()}
+
+    def test_trailing_nul_stripped(self):
+        self.add_proc(10, b"curl", b"curl\0https://api.openai.com\0")
+        self.assertEqual(self.procs()[10], (b"curl", b"curl\0https://api.openai.com"))
+
+    def test_empty_cmdline_kernel_thread(self):
+        self.add_proc(2, b"kthreadd", b"")
+        self.assertEqual(self.procs()[2], (b"kthreadd", b""))
+
+    def test_space_separated_cmdline_split_like_psutil(self):
+        self.add_proc(11, b"python3", b"worker: llm queue ")
+        self.add_proc(12, b"python3", b"worker: llm queue\0")
+        procs = self.procs()
+        self.assertEqual(procs[11][1], b"worker:\0llm\0queue")
+        self.assertEqual(procs[12][1], b"worker:\0llm\0queue")
+
+    def test_truncated_comm_recovered_from_argv0(self):
+        self.add_proc(13, b"open-webui-serv", b"/opt/bin/open-webui-server\0--port\0")
+        self.add_proc(14, b"some-other-name", b"/usr/bin/unrelated\0")
+        procs = self.procs()
+        self.assertEqual(procs[13][0], b"open-webui-server")
+        self.assertEqual(procs[14][0], b"some-other-name")
+
+    def test_vanished_pid_skipped(self):
+        self.add_proc(15)  # directory only: comm/cmdline already gone
+        self.add_proc(16, b"bash", b"bash\0")
+        self.assertEqual(list(self.procs()), [16])
+
+    def test_psutil_fallback_when_listdir_fails(self):
+        self.agent.PROC_ROOT = os.path.join(self.tmp.name, "missing")
+
+        class NoSuchProcess(Exception):
+            pass
+
+        class Vanished:
+            @property
+            def info(self):
+                raise NoSuchProcess()
+
+        live = types.SimpleNamespace(
+            info={
+                "pid": 7,
+                "name": "ollama",
+                "cmdline": ["ollama", "serve"],
+                "username": "alice",
+            }
+        )
+        self.agent.psutil = types.SimpleNamespace(
+            process_iter=lambda attrs: [Vanished(), live],
+            NoSuchProcess=NoSuchProcess,
+            AccessDenied=NoSuchProcess,
+            ZombieProcess=NoSuchProcess,
+        )
+        self.assertEqual(
+            list(self.agent.iter_processes()),
+            [(7, b"ollama", b"ollama\0serve", "alice")],
+        )
+
+    def test_no_proc_and_no_psutil_raises(self):
+        self.agent.PROC_ROOT = os.path.join(self.tmp.name, "missing")
+        self.agent.psutil = None
+        with self.assertRaises(OSError):
+            list(self.agent.iter_processes())
+
+
+    def test_failed_username_lookup_is_retried(self):
+        calls = []
+
+        def getpwuid(uid):
+            calls.append(uid)
+            if len(calls) == 1:
+                raise KeyError(uid)
+            return types.SimpleNamespace(pw_name="alice")
+
+        self.agent.pwd = types.SimpleNamespace(getpwuid=getpwuid)
+        self.assertEqual(self.agent.username_for_uid(1234), "1234")
+        self.assertEqual(self.agent.username_for_uid(1234), "alice")
+        self.assertEqual(self.agent.username_for_uid(1234), "alice")
+        self.assertEqual(calls, [1234, 1234])
+
+
+if __name__ == "__main__":
+    unittest.main()
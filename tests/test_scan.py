@@ -0,0 +1,181 @@
+import contextlib
+import io
+import json
+import unittest
+
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None
+from queue import SimpleQueue
+
+from agent_loader import load_agent
+
+TIMESTAMP = "2026-01-02T03:04:05.000006+00:00"
+
+BASELINE_KEYS = [
+    "timestamp_utc",
+    "hostname",
+    "username",
+    "pid",
+    "process_name",
+    "cmdline",
+    "signature_name",
+    "signature_description",
+    "risk",
+    "category",
+    "version",
+    "product",
+]
+
+
+class ScanTestCase(unittest.TestCase):
+    def setUp(self):
+        self.agent = load_agent()
+        self.agent.utc_now_iso = lambda: TIMESTAMP
+        self.matcher = self.agent.build_matcher(self.agent.SIGNATURES)
+        self.seen = {}
+        self.processes = []
+        self.agent.iter_processes = lambda: iter(self.processes)
+
+    def scan(self):
+        """Run scan_once() and return (events_written, queued lines)."""
+        queue = SimpleQueue()
+        events = self.agent.scan_once(
+            self.matcher, self.seen, self.agent.json_bytes("host-ü"), queue
+        )
+        lines = []
+        while not queue.empty():
+            lines.extend(queue.get().splitlines(keepends=True))
+        return events, lines
+
+    def baseline_event(self, pid, pname, cmdline, username, sig_name):
+        sig = next(s for s in self.agent.SIGNATURES if s["name"] == sig_name)
+        return {
+            "timestamp_utc": TIMESTAMP,
+            "hostname": "host-ü",
+            "username": username,
+            "pid": pid,
+            "process_name": pname,
+            "cmdline": cmdline,
+            "signature_name": sig["name"],
+            "signature_description": sig["description"],
+            "risk": sig["risk"],
+            "category": sig["category"],
+            "version": "v0.1",
+            "product": "Red Specter AI Usage Watchdog",
+        }
+
+
+class TestEventFormat(ScanTestCase):
+    def test_lines_match_baseline_events(self):
+        argv = ["curl", 'x-"quoted"', "C:\\path\\llm", "ünïcode", "api.openai.com"]
+        self.processes = [
+            (1, b"bash", b"bash", "root"),
+            (42, b"curl", "\0".join(argv).encode("utf-8"), "jörg"),
+            (43, b"ollama", b"ollama\0serve", "svc"),
+        ]
+
+        events, lines = self.scan()
+
+        self.assertEqual(events, len(lines))
+        self.assertEqual(
+            [json.loads(line) for line in lines],
+            [
+                self.baseline_event(42, "curl", argv, "jörg", "openai_api_call"),
+                self.baseline_event(42, "curl", argv, "jörg", "generic_llm_keyword"),
+                self.baseline_event(
+                    43, "ollama", ["ollama", "serve"], "svc", "ollama_local_llm"
+                ),
+            ],
+        )
+        for line in lines:
+            self.assertTrue(line.endswith(b"}\n"))
+            self.assertEqual(list(json.loads(line)), BASELINE_KEYS)
+
+    def assert_compact_lines(self):
+        argv = ["run", 'say "hi"\\now', "ünïcode\ttab", "--llm"]
+        self.processes = [(7, b"python3", "\0".join(argv).encode("utf-8"), "ö")]
+
+        events, lines = self.scan()
+
+        expected = self.baseline_event(7, "python3", argv, "ö", "generic_llm_keyword")
+        self.assertEqual(events, 1)
+        self.assertEqual(
+            lines,
+            [
+                json.dumps(expected, ensure_ascii=False, separators=(",", ":"))
+                .encode("utf-8")
+                + b"\n"
+            ],
+        )
+
+    def test_compact_format_stdlib(self):
+        self.agent.orjson = None
+        self.assert_compact_lines()
+
+    @unittest.skipIf(orjson is None, "orjson not installed")
+    def test_compact_format_orjson(self):
+        self.agent.orjson = orjson
+        self.assert_compact_lines()
+
+    def test_no_matches_queues_nothing(self):
+        self.processes = [(1, b"bash", b"bash\0-l", "root")]
+        self.assertEqual(self.scan(), (0, []))
+
+
+class TestSeenState(ScanTestCase):
+    OPENAI = (10, b"curl", b"curl\0https://api.openai.com", "root")
+    OLLAMA = (20, b"ollama", b"ollama\0serve", "root")
+
+    def signature_bit(self, name):
+        names = [sig["name"] for sig in self.agent.SIGNATURES]
+        return 1 << names.index(name)
+
+    def test_logged_once_dropped_when_gone_and_logged_again_on_return(self):
+        self.processes = [self.OPENAI]
+        self.assertEqual(self.scan()[0], 1)
+        self.assertEqual(self.seen, {10: self.signature_bit("openai_api_call")})
+
+        # Still running: nothing new to log
+        self.assertEqual(self.scan(), (0, []))
+        self.assertIn(10, self.seen)
+
+        # Exited (or PID reused by a non-matching process): dropped
+        self.processes = []
+        self.assertEqual(self.scan(), (0, []))
+        self.assertEqual(self.seen, {})
+
+        # Back again: logged afresh
+        self.processes = [self.OPENAI]
+        self.assertEqual(self.scan()[0], 1)
+
+    def test_oserror_mid_scan_merges_state(self):
+        self.processes = [self.OPENAI]
+        self.scan()
+
+        def failing_scan():
+            yield self.OLLAMA
+            raise OSError("proc went away")
+
+        self.agent.iter_processes = failing_scan
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            events, lines = self.scan()
+
+        self.assertIn("Process scan failed", out.getvalue())
+        self.assertEqual((events, len(lines)), (1, 1))
+        self.assertEqual(
+            self.seen,
+            {
+                10: self.signature_bit("openai_api_call"),
+                20: self.signature_bit("ollama_local_llm"),
+            },
+        )
+
+        # PID 10 was kept, so the next full scan does not re-log it
+        self.agent.iter_processes = lambda: iter([self.OPENAI, self.OLLAMA])
+        self.assertEqual(self.scan(), (0, []))
+
+
+if __name__ == "__main__":
+    unittest.main()